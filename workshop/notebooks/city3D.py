@@ -17,6 +17,11 @@
 import json
 import fiona
 import copy
+import time
+import multiprocessing
+from datetime import timedelta
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 import numpy as np
 import pandas as pd
@@ -697,4 +702,149 @@ def output_cityjson(extent, minz, maxz, TerrainT, pts, jparams, min_zbld, acoi,
     c.close() 
     #clean cityjson
     cm = cityjson.load(jparams['cjsn_out'])               
-    cityjson.save(cm, jparams['cjsn_solid']) 
\ No newline at end of file
+    cityjson.save(cm, jparams['cjsn_solid']) 
+
+##- raster stages
+def clip_raster(jparams, epsg, extent):
+    """
+    project and clip the DEM to the extent of the area of interest
+    - returns the path of the clipped raster
+    """
+    from osgeo import gdal
+
+    gdal.SetConfigOption("GTIFF_SRS_SOURCE", "GEOKEYS")
+    gdal.UseExceptions()
+
+    OutTile = gdal.Warp(jparams['projClip_raster'],
+                        jparams['in_raster'],
+                        dstSRS=epsg,
+                        srcNodata=jparams['nodata'],
+                        outputBounds=[extent[0], extent[1], extent[2], extent[3]])
+    OutTile = None
+
+    return jparams['projClip_raster']
+
+def raster_to_xyz(raster, jparams):
+    """
+    write the (clipped) DEM as xyz points
+    - returns the path of the .xyz
+    """
+    from osgeo import gdal
+
+    gdal.UseExceptions()
+
+    xyz = gdal.Translate(jparams['xyz'], raster, format='XYZ')
+    xyz = None
+
+    return jparams['xyz']
+
+##- footprint stages
+def simplify_topology(ts):
+    """
+    drop osm nodes; orient segments and simplify the topology of the building footprints
+    """
+    import topojson as tp
+
+    ts = ts.drop(ts.index[ts['type'] == 'node'])
+    topo = tp.Topology(ts, prequantize=False, winding_order='CCW_CW')
+    with np.errstate(invalid='ignore'):
+        return topo.toposimplify(0.25).to_gdf()
+
+##- stage scheduler
+def _timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return result, start, time.time()
+
+def run_stages(stages, max_workers=None):
+    """
+    run the stages of the workflow; each stage starts as soon as the stages it depends on are done
+    - stages: {name: (func, [dependencies])} or {name: (func, [dependencies], 'thread' | 'process')}
+      func is called with the results of its dependencies (in the order listed)
+    - GDAL releases the GIL ~ 'thread' (the default) suits raster and file I/O.
+      pure Python stages (topology, footprints) are better on 'process'; their func and arguments must pickle
+      and the func must live in a module (not the notebook) ~ process workers are spawned, not forked, so a
+      running GDAL thread cannot leave them locked
+    returns the result and the (start, end) time in seconds of every stage
+
+    e.g.
+        stages = {'dem': (partial(city3D.clip_raster, jparams, epsg, extent), []),
+                  'xyz': (partial(city3D.raster_to_xyz, jparams=jparams), ['dem']),
+                  'topo': (partial(city3D.simplify_topology, ts), [], 'process')}
+        results, timings = city3D.run_stages(stages)
+        city3D.print_stage_timings(stages, timings)
+    """
+    for name, stage in stages.items():
+        for dep in stage[1]:
+            if dep not in stages:
+                raise ValueError("stage '{}' depends on unknown stage '{}'".format(name, dep))
+        if len(stage) > 2 and stage[2] not in ('thread', 'process'):
+            raise ValueError("stage '{}' runs on unknown pool '{}'; use 'thread' or 'process'".format(name, stage[2]))
+
+    pools = {'thread': ThreadPoolExecutor(max_workers)}
+    n_process = sum(1 for stage in stages.values() if len(stage) > 2 and stage[2] == 'process')
+    if n_process:
+        pools['process'] = ProcessPoolExecutor(min(n_process, max_workers or n_process),
+                                               mp_context=multiprocessing.get_context('spawn'))
+
+    pending = dict(stages)
+    running = {}
+    results = {}
+    timings = {}
+    t0 = time.time()
+    try:
+        while pending or running:
+            #- submit every stage whose dependencies are done
+            for name in [n for n, s in pending.items() if all(d in results for d in s[1])]:
+                stage = pending.pop(name)
+                pool = pools[stage[2] if len(stage) > 2 else 'thread']
+                running[pool.submit(_timed, stage[0], *[results[d] for d in stage[1]])] = name
+
+            if not running:
+                raise ValueError("circular stage dependencies: {}".format(", ".join(pending)))
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], start, end = future.result()
+                timings[name] = (start - t0, end - t0)
+    finally:
+        for pool in pools.values():
+            pool.shutdown(cancel_futures=True)
+
+    return results, timings
+
+def print_stage_timings(stages, timings):
+    """
+    report when each stage started and how long it took
+    - with the total runtime, the sum of all stages and the longest chain of dependent stages (the critical path)
+    """
+    chain = {}
+    def longest(name):
+        if name not in chain:
+            start, end = timings[name]
+            chain[name] = (end - start) + max([longest(d) for d in stages[name][1]], default=0)
+        return chain[name]
+
+    for name, (start, end) in sorted(timings.items(), key=lambda t: t[1][0]):
+        print('{:<20} start: {}  runtime: {}'.format(name, str(timedelta(seconds=start)),
+                                                    str(timedelta(seconds=(end - start)))))
+
+    print('runtime:', str(timedelta(seconds=max(end for start, end in timings.values()))))
+    print('sum of stages:', str(timedelta(seconds=sum(end - start for start, end in timings.values()))))
+    print('critical path:', str(timedelta(seconds=max(longest(name) for name in timings))))
+
+def prepare_dem_footprints(jparams, epsg, extent, ts, max_workers=None):
+    """
+    clip the DEM and write the .xyz (threads) while the building topology is simplified (process)
+    - the DEM only needs the extent; it does not wait for the buildings
+    prints the timings of each stage and returns the simplified buildings
+    """
+    stages = {'clip_raster': (partial(clip_raster, jparams, epsg, extent), []),
+              'raster_to_xyz': (partial(raster_to_xyz, jparams=jparams), ['clip_raster']),
+              'simplify_topology': (partial(simplify_topology, ts), [], 'process')}
+
+    results, timings = run_stages(stages, max_workers)
+    print_stage_timings(stages, timings)
+
+    return results['simplify_topology']
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# env/geo3D_distV2
+#########################
+# helper functions to estimate population and Building Volume per Capita (BVPC) from a LoD1 3D City Model.
+#    - the same occupancy rules as the CityJSONspatialDataScience notebook; written as column expressions
+#      so an entire suburb is evaluated at once instead of row by row.
+
+# author: arkriger - 2023 - 2025
+# github: https://github.com/AdrianKriger/geo3D
+
+# reference:
+#    - BVPC: https://www.researchgate.net/publication/343185735_Building_Volume_Per_Capita_BVPC_A_Spatially_Explicit_Measure_of_Inequality_Relevant_to_the_SDGs
+#########################
+
+import numpy as np
+import pandas as pd
+
+storeyheight = 2.8
+#- buildings taller than this have an unoccupied ground floor (retail, etc.) [arbitrary; based on local knowledge]
+ground_floor_levels = 7
+
+def _column(df, name):
+    """Return the column ``name``; or all missing when the attribute was never mapped."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(np.nan, index=df.index)
+
+def estimate_population(df, f_house=4, inf_structure=3, apartment=3, student=3):
+    """
+    estimate the residents of each building
+    - f_house: average number of residents per formal house
+    - inf_structure: average number of residents per informal structure (and per social housing flat / facility unit)
+    - apartment: average number of residents per formal apartment
+    - student: residents of a single storey student residence
+    buildings without a rule are returned as NaN
+    """
+    bld = df['building']
+    levels = df['building:levels']
+    units = _column(df, 'building:units')
+    flats = _column(df, 'building:flats')
+    rooms = _column(df, 'rooms')
+    beds = _column(df, 'beds')
+    has_rooms = 'rooms' in df.columns
+    has_flats = 'building:flats' in df.columns
+    has_beds = 'beds' in df.columns
+
+    no_facility = _column(df, 'social_facility').isna()
+    multi = levels > 1
+    #- in this case social housing
+    social = (bld == 'residential') & no_facility
+    #-- social facility [shelter / carehome]
+    facility = (bld == 'residential') & ~no_facility
+    # university owned student residence
+    dorm = (bld == 'dormitory') & (_column(df, 'residential') == 'university')
+
+    conditions = [
+        #- formal house
+        bld.isin(['house', 'semidetached_house']),
+        bld == 'terrace',
+        #- informal structure (shack)
+        bld == 'cabin',
+        social & multi & has_rooms & (rooms != 0),
+        social & multi & has_flats & (flats != 0),
+        social & multi,
+        social,
+        facility & (units != 0),
+        facility,
+        #- formal apartment
+        bld == 'apartments',
+        #- private student residence
+        (bld == 'student') & multi,
+        bld == 'student',
+        dorm & multi & has_rooms & (rooms != 0),
+        dorm & multi & has_beds & (beds != 0),
+        dorm & multi,
+        dorm,
+    ]
+    choices = [
+        f_house,
+        units * f_house,
+        inf_structure,
+        rooms,
+        flats * inf_structure,
+        np.nan,
+        inf_structure,
+        units * inf_structure,
+        beds,
+        flats * apartment,
+        flats,
+        student,
+        rooms,
+        beds,
+        np.nan,
+        student,
+    ]
+    conditions = [np.asarray(c, dtype=bool) for c in conditions]
+    choices = [np.asarray(c, dtype=float) for c in choices]
+
+    return pd.Series(np.select(conditions, choices, default=np.nan), index=df.index)
+
+def building_volume(df, height='building_height', storeyheight=storeyheight, ground_floor_levels=ground_floor_levels):
+    """
+    footprint area times height of each building
+    - remove the volume of the (unoccupied) ground floor of residential, apartment and student buildings
+      with more than ground_floor_levels
+    """
+    area = df.geometry.area
+    volume = area * df[height]
+
+    tall = (_column(df, 'social_facility').isna() & (df['building:levels'] > ground_floor_levels) &
+            df['building'].isin(['residential', 'apartments', 'student']))
+
+    return volume.where(~tall, volume - area * storeyheight)
+
+def bvpc(volume, population):
+    """Building Volume per Capita: the sum of building volume divided by the total population [0 if nobody lives there]."""
+    total = population.sum()
+    if total == 0:
+        return 0
+    return round(volume.sum() / total, 3)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#########################
+# city3D_analytics against the row functions it replaced in CityJSONspatialDataScience.ipynb
+#########################
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+import city3D_analytics
+
+f_house = 4
+inf_structure = 3
+
+#- the notebook: population estimate per row
+def notebook_pop(gdf_pop):
+    c = gdf_pop.columns
+
+    def pop(row):
+        #- formal house
+        if row['building'] == 'house' or row['building'] == 'semidetached_house':
+            return f_house
+        if row['building'] == 'terrace':
+            return row['building:units'] * f_house
+
+        #- informal structure (shack)
+        if row['building'] == 'cabin':
+            return inf_structure
+
+        #- in this case social housing
+        if row['building'] == 'residential' and 'social_facility' in c and row['social_facility'] is np.nan:
+            if row['building:levels'] > 1:
+                if 'rooms' in row and row['rooms'] != 0:
+                    return row['rooms']
+                if 'building:flats' in row and row['building:flats'] != 0:
+                    return row['building:flats'] * inf_structure
+            else:
+                return inf_structure
+        #-- social facility [shelter / carehome]
+        if row['building'] == 'residential' and row['social_facility'] is not np.nan:
+            if row['building:units'] != 0:
+                return row['building:units'] * inf_structure
+            else:
+                return row['beds']
+
+        #- formal apartment
+        if row['building'] == 'apartments':
+            return row['building:flats'] * 3
+
+        #- private student residence
+        if row['building'] == 'student':
+            if row['building:levels'] > 1:
+                return row['building:flats']
+            else:
+                return 3
+        # university owned student residence
+        if row['building'] == 'dormitory' and row['residential'] == 'university':
+            if row['building:levels'] > 1:
+                if 'rooms' in row and row['rooms'] != 0:
+                    return row['rooms']
+                if 'beds' in row and row['beds'] != 0:
+                    return row['beds']
+            else:
+                return 3
+
+    return pd.to_numeric(gdf_pop.apply(lambda x: pop(x), axis=1)).astype(float)
+
+#- the notebook: ground floor volume deduction per row
+def notebook_volume(gdf_pop):
+    gdf_pop = gdf_pop.copy()
+    gdf_pop['area'] = gdf_pop['geometry'].area
+    gdf_pop['volume'] = gdf_pop['area'] * gdf_pop['building_height']
+
+    gdf_pop['volume'] = [
+        (row['volume'] - row['area'] * 2.8) if (
+            'social_facility' in row and row['social_facility'] is np.nan and (row['building:levels'] > 7 and
+            row['building'] in ['residential', 'apartments', 'student'])
+        ) else row['volume']
+        for _, row in gdf_pop.iterrows()
+    ]
+    return gdf_pop['volume']
+
+def buildings():
+    """every branch of the notebook rules; levels of 1, 2, > 7 and missing"""
+    rows = []
+    for levels in [1., 2., 8., 12., np.nan]:
+        for building in ['house', 'semidetached_house', 'terrace', 'cabin', 'apartments', 'student']:
+            rows.append(dict(building=building, levels=levels, units=3., flats=5., rooms=0., beds=0.))
+        for facility in [np.nan, 'shelter']:
+            for rooms, flats, units, beds in [(0., 0., 0., 0.), (0., 6., 0., 12.), (20., 0., 4., 0.), (20., 6., 4., 12.)]:
+                rows.append(dict(building='residential', levels=levels, units=units, flats=flats,
+                                 rooms=rooms, beds=beds, social_facility=facility))
+        for residential in ['university', np.nan]:
+            for rooms, beds in [(0., 0.), (0., 40.), (30., 0.), (30., 40.)]:
+                rows.append(dict(building='dormitory', levels=levels, units=0., flats=0.,
+                                 rooms=rooms, beds=beds, residential=residential))
+
+    df = pd.DataFrame(rows).rename(columns={'levels': 'building:levels', 'units': 'building:units',
+                                            'flats': 'building:flats'})
+    #- the notebook compares against the np.nan singleton
+    for column in ['social_facility', 'residential']:
+        df[column] = [np.nan if pd.isna(v) else v for v in df[column]]
+    df['building_height'] = df['building:levels'].fillna(1) * 2.8 + 1.3
+
+    return gpd.GeoDataFrame(df, geometry=[box(0, 0, 5 + i % 7, 8 + i % 5) for i in range(len(df))])
+
+@pytest.mark.parametrize("drop", [[], ['rooms'], ['beds'], ['rooms', 'beds']])
+def test_estimate_population(drop):
+    gdf_pop = buildings()
+    if 'beds' in drop:
+        #- the notebook reads beds unguarded for a social facility without units
+        gdf_pop = gdf_pop[~(gdf_pop['social_facility'].notna() & (gdf_pop['building:units'] == 0))]
+    gdf_pop = gdf_pop.drop(columns=drop)
+
+    pd.testing.assert_series_equal(city3D_analytics.estimate_population(gdf_pop, f_house, inf_structure),
+                                   notebook_pop(gdf_pop), check_names=False)
+
+@pytest.mark.parametrize("drop", [[], ['rooms', 'beds']])
+def test_building_volume(drop):
+    gdf_pop = buildings().drop(columns=drop)
+
+    pd.testing.assert_series_equal(city3D_analytics.building_volume(gdf_pop),
+                                   notebook_volume(gdf_pop), check_names=False)
+
+def test_bvpc():
+    gdf_pop = buildings()
+    volume = city3D_analytics.building_volume(gdf_pop)
+    population = city3D_analytics.estimate_population(gdf_pop, f_house, inf_structure)
+
+    assert city3D_analytics.bvpc(volume, population) == round(volume.sum() / population.sum(), 3)
+    assert city3D_analytics.bvpc(volume, population * 0) == 0
+
+def test_building_volume_without_social_facility():
+    gdf_pop = buildings().drop(columns=['social_facility'])
+    area = gdf_pop.geometry.area
+    volume = area * gdf_pop['building_height']
+    #- no column means no facility tagged ~ the ground floor is removed [the notebook kept the full volume]
+    tall = (gdf_pop['building:levels'] > 7) & gdf_pop['building'].isin(['residential', 'apartments', 'student'])
+
+    pd.testing.assert_series_equal(city3D_analytics.building_volume(gdf_pop),
+                                   volume.where(~tall, volume - area * 2.8), check_names=False)
+    assert tall.sum() == 20
+
+def test_social_facility_none():
+    #- a null from cjio is no facility; the same as NaN [the notebook counted None as a facility]
+    gdf_pop = buildings()
+    gdf_none = gdf_pop.copy()
+    gdf_none['social_facility'] = pd.Series([None if v is np.nan else v for v in gdf_pop['social_facility']],
+                                            index=gdf_pop.index, dtype=object)
+    assert gdf_none['social_facility'].map(lambda v: v is None).any()
+
+    pd.testing.assert_series_equal(city3D_analytics.estimate_population(gdf_none, f_house, inf_structure),
+                                   city3D_analytics.estimate_population(gdf_pop, f_house, inf_structure))
+    pd.testing.assert_series_equal(city3D_analytics.building_volume(gdf_none),
+                                   city3D_analytics.building_volume(gdf_pop))
+
+def test_estimate_population_without_social_facility():
+    #- no column means no facility tagged ~ residential is social housing [the notebook raised KeyError]
+    gdf_pop = buildings()
+    gdf_nan = gdf_pop.assign(social_facility=np.nan)
+
+    pd.testing.assert_series_equal(
+        city3D_analytics.estimate_population(gdf_pop.drop(columns=['social_facility']), f_house, inf_structure),
+        city3D_analytics.estimate_population(gdf_nan, f_house, inf_structure))